@@ -1,13 +1,15 @@
 from fastapi import APIRouter, HTTPException, Depends
+from pymongo.errors import DuplicateKeyError
 
 from app.core.config import settings
 from app.database.mongo import users_collection
 from app.auth.schemas import RegisterRequest, LoginRequest, RefreshTokenRequest
-from app.core.security import hash_password, verify_password, create_access_token, create_refresh_token, verify_access_token
+from app.core.security import hash_password, verify_password, password_needs_rehash, create_access_token, create_refresh_token, verify_access_token
 from app.auth.services import verify_google_token
 
-from jose import jwt, JWTError
-from datetime import datetime
+import jwt
+from jwt import InvalidTokenError
+from datetime import datetime, timezone
 import uuid
 
 router = APIRouter(prefix="/api/v1/auth", tags=["Auth"])
@@ -17,9 +19,9 @@ router = APIRouter(prefix="/api/v1/auth", tags=["Auth"])
 @router.post("/register", status_code=201)
 async def register_user(request: RegisterRequest):
 
-    existing_user = await users_collection.find_one({
+    existing_user = await users_collection.count_documents({
         "$or": [{"email": request.email}, {"username": request.username}]
-    })
+    }, limit=1)
 
     if existing_user:
         raise HTTPException(
@@ -44,7 +46,7 @@ async def register_user(request: RegisterRequest):
             )
         password_hash = None
     else:
-        password_hash = hash_password(request.password)
+        password_hash = await hash_password(request.password)
 
     user_data = {
         "_id": str(uuid.uuid4()),
@@ -55,10 +57,21 @@ async def register_user(request: RegisterRequest):
         "core_memory": {},
         "constraints": {},
         "auth_provider": request.auth_provider,
-        "created_at": datetime.utcnow()
+        "created_at": datetime.now(timezone.utc)
     }
 
-    await users_collection.insert_one(user_data)
+    try:
+        await users_collection.insert_one(user_data)
+    except DuplicateKeyError:
+        # Lost a race with a concurrent registration (unique email/username indexes)
+        raise HTTPException(
+            status_code=409,
+            detail={
+                "status": "error",
+                "code": "USER_ALREADY_EXISTS",
+                "message": "Email or username already in use."
+            }
+        )
 
     access_token = create_access_token({"user_id": user_data["_id"]})
     refresh_token = create_refresh_token({"user_id": user_data["_id"]})
@@ -85,11 +98,18 @@ async def register_user(request: RegisterRequest):
 @router.post("/login")
 async def login_user(request: LoginRequest):
 
-    user = await users_collection.find_one({"email": request.email})
+    user = await users_collection.find_one({"email": request.email}, {"password_hash": 1})
 
-    if not user or not verify_password(request.password, user["password_hash"]):
+    if not user or not await verify_password(request.password, user["password_hash"]):
         raise HTTPException(status_code=401, detail="Invalid credentials")
 
+    # Upgrade legacy (bcrypt) hashes to the current scheme
+    if password_needs_rehash(user["password_hash"]):
+        await users_collection.update_one(
+            {"_id": user["_id"]},
+            {"$set": {"password_hash": await hash_password(request.password)}}
+        )
+
     access_token = create_access_token({"user_id": user["_id"]})
     refresh_token = create_refresh_token({"user_id": user["_id"]})
 
@@ -142,5 +162,5 @@ async def refresh_access_token(request: RefreshTokenRequest):
             "access_token": new_access_token
         }
 
-    except JWTError:
+    except InvalidTokenError:
         raise HTTPException(status_code=401, detail="Invalid or expired refresh token")
\ No newline at end of file
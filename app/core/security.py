@@ -3,35 +3,93 @@ from app.core.config import settings
 from fastapi import Depends, HTTPException, status
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 
+import asyncio
+import base64
+import hashlib
+import hmac
+import json
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from cachetools import TTLCache
 from passlib.context import CryptContext
-from datetime import datetime, timedelta
-from jose import jwt, JWTError
+import jwt
+from jwt import InvalidTokenError
 
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+# argon2id for new hashes; bcrypt kept so existing hashes still verify and get rehashed on login
+pwd_context = CryptContext(
+    schemes=["argon2", "bcrypt"],
+    deprecated="auto",
+    argon2__type="ID",
+    argon2__memory_cost=19456,
+    argon2__time_cost=2,
+    argon2__parallelism=1,
+)
 security = HTTPBearer()
 
-def hash_password(password: str):
-    return pwd_context.hash(password)
+# Dedicated pool for password hashing, sized to the CPU count. Kept separate from
+# the default executor so filesystem work (asyncio.to_thread) can't starve logins.
+_kdf_executor = ThreadPoolExecutor(max_workers=os.cpu_count(), thread_name_prefix="kdf")
 
-def verify_password(password, password_hash):
-    return pwd_context.verify(password, password_hash)
+# Decoded access tokens, keyed by the raw token. TTL is kept short so the
+# revocation window stays small; the token's own exp is re-checked on every hit.
+_jwt_cache = TTLCache(maxsize=10000, ttl=30)
+_jwt_cache_lock = threading.Lock()
+
+# Token lifetimes in seconds
+_ACCESS_TTL = 30 * 60
+_REFRESH_TTL = 7 * 24 * 60 * 60
+
+def _b64encode(data: bytes):
+    return base64.urlsafe_b64encode(data).rstrip(b"=")
+
+# Every token we issue shares this header, so encode it once
+_JWT_HEADER_B64 = _b64encode(b'{"alg":"HS256","typ":"JWT"}')
+
+def _encode_hs256(payload: dict, key: str):
+    # Fast path for jwt.encode: reuses the precomputed header and signs with stdlib hmac
+    body = json.dumps(payload, separators=(",", ":")).encode()
+    signing_input = _JWT_HEADER_B64 + b"." + _b64encode(body)
+    signature = hmac.new(key.encode(), signing_input, hashlib.sha256).digest()
+    return (signing_input + b"." + _b64encode(signature)).decode()
+
+# Hashing is CPU-bound, so run it in the KDF pool to keep the event loop free
+async def hash_password(password: str):
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(_kdf_executor, pwd_context.hash, password)
+
+async def verify_password(password, password_hash):
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(_kdf_executor, pwd_context.verify, password, password_hash)
+
+def password_needs_rehash(password_hash: str):
+    return pwd_context.needs_update(password_hash)
 
 def create_access_token(data: dict):
     payload = data.copy()
-    payload["exp"] = datetime.utcnow() + timedelta(minutes=30)
-    return jwt.encode(payload, settings.JWT_SECRET_KEY, algorithm="HS256")
+    payload["exp"] = int(time.time()) + _ACCESS_TTL
+    return _encode_hs256(payload, settings.JWT_SECRET_KEY)
 
 def create_refresh_token(data: dict):
     payload = data.copy()
-    payload["exp"] = datetime.utcnow() + timedelta(days=7)
-    return jwt.encode(payload, settings.JWT_REFRESH_SECRET_KEY, algorithm="HS256")
+    payload["exp"] = int(time.time()) + _REFRESH_TTL
+    return _encode_hs256(payload, settings.JWT_REFRESH_SECRET_KEY)
 
 def verify_access_token(credentials: HTTPAuthorizationCredentials = Depends(security)):
     token = credentials.credentials
+
+    with _jwt_cache_lock:
+        cached = _jwt_cache.get(token)
+    if cached is not None and cached["exp"] > time.time():
+        return cached
+
     try:
         payload = jwt.decode(token, settings.JWT_SECRET_KEY, algorithms=["HS256"])
+        with _jwt_cache_lock:
+            _jwt_cache[token] = payload
         return payload  # contains user_id
-    except JWTError:
+    except InvalidTokenError:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Invalid or expired access token"
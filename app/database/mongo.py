@@ -1,8 +1,14 @@
 from motor.motor_asyncio import AsyncIOMotorClient
 from app.core.config import settings
 
-client = AsyncIOMotorClient(settings.MONGO_URI)
+client = AsyncIOMotorClient(
+    settings.MONGO_URI,
+    minPoolSize=10,
+    maxPoolSize=50,
+    serverSelectionTimeoutMS=2000
+)
 db = client[settings.MONGO_DB_NAME]
 users_collection = db["users"]
 folders_collection = db["folders"]
-projects_collection = db["projects"]
\ No newline at end of file
+projects_collection = db["projects"]
+counters_collection = db["counters"]
@@ -1,22 +1,30 @@
+import asyncio
+import logging
 import os
 import shutil
 import uuid
 from typing import List
-from datetime import datetime
-from fastapi import APIRouter, HTTPException, Depends, status
+from datetime import datetime, timezone
+from fastapi import APIRouter, HTTPException, Depends, Query, status
+from pymongo import ReturnDocument
+from pymongo.errors import DuplicateKeyError
 from app.core.security import verify_access_token
 from app.core.config import settings
 from app.database.mongo import folders_collection
 from app.folders.schemas import FolderCreateRequest, FolderResponse, FolderUpdateRequest
 
 router = APIRouter(prefix="/api/v1/folders", tags=["Folders"])
+logger = logging.getLogger(__name__)
+
+# Resolved once; paths below are built by plain string joins instead of os.path.join
+_DATA_DIR = str(settings.DATA_DIR)
 
 # Helper to get safe paths
 def get_user_storage_path(user_id: str):
-    return os.path.join(settings.DATA_DIR, user_id)
+    return f"{_DATA_DIR}{os.sep}{user_id}"
 
 def get_folder_path(user_id: str, folder_name: str):
-    return os.path.join(get_user_storage_path(user_id), folder_name)
+    return f"{get_user_storage_path(user_id)}{os.sep}{folder_name}"
 
 
 # --- 1. CREATE FOLDER ---
@@ -27,34 +35,27 @@ async def create_folder(
 ):
     user_id = payload.get("user_id")
     
-    # 1. Sanitize Folder Name
-    safe_name = "".join([c for c in request.name if c.isalnum() or c in (' ', '_', '-')]).strip()
-    if not safe_name:
-         raise HTTPException(status_code=400, detail="Invalid folder name")
-
-    # 2. Check DB for duplicates (Ensures name uniqueness)
-    existing_folder = await folders_collection.find_one({
-        "user_id": user_id, 
-        "name": safe_name
-    })
-    if existing_folder:
-        raise HTTPException(status_code=409, detail="Folder with this name already exists")
+    # 1. Folder name is already sanitized by FolderCreateRequest
+    safe_name = request.name
 
-    # 3. Create Physical Directory
+    # 2. Create Physical Directory
     full_path = get_folder_path(user_id, safe_name)
     try:
-        os.makedirs(full_path, exist_ok=True)
+        await asyncio.to_thread(os.makedirs, full_path, exist_ok=True)
     except OSError as e:
         raise HTTPException(status_code=500, detail=f"File system error: {str(e)}")
 
-    # 4. Insert into MongoDB
+    # 3. Insert into MongoDB (unique (user_id, name) index ensures name uniqueness)
     new_folder = {
         "_id": str(uuid.uuid4()),
         "user_id": user_id,
         "name": safe_name,
-        "created_at": datetime.utcnow()
+        "created_at": datetime.now(timezone.utc)
     }
-    await folders_collection.insert_one(new_folder)
+    try:
+        await folders_collection.insert_one(new_folder)
+    except DuplicateKeyError:
+        raise HTTPException(status_code=409, detail="Folder with this name already exists")
 
     return {
         "status": "success",
@@ -65,19 +66,28 @@ async def create_folder(
 # --- 2. FETCH ALL FOLDERS (NEW) ---
 @router.get("", status_code=200)
 async def get_all_folders(
+    skip: int = Query(0, ge=0),
+    limit: int = Query(100, ge=1, le=100),
     payload: dict = Depends(verify_access_token)
 ):
     user_id = payload.get("user_id")
 
-    # Fetch all documents matching the user_id
-    cursor = folders_collection.find({"user_id": user_id})
-    # Convert cursor to a Python list
-    folders = await cursor.to_list(length=None)
+    # Fetch one page of the user's folders, newest first; _id breaks created_at ties so pages
+    # are stable (served by the (user_id, created_at, _id) index)
+    cursor = (
+        folders_collection.find({"user_id": user_id}, {"name": 1, "created_at": 1})
+        .sort([("created_at", -1), ("_id", -1)])
+        .skip(skip)
+        .limit(limit)
+        .batch_size(limit)
+    )
+    folders = await cursor.to_list(length=limit)
 
     return {
         "status": "success",
         "results": len(folders),
-        "data": folders
+        "data": folders,
+        "next_skip": skip + len(folders) if len(folders) == limit else None
     }
 
 
@@ -92,7 +102,7 @@ async def get_folder_id_by_name(
     folder = await folders_collection.find_one({
         "user_id": user_id, 
         "name": folder_name
-    })
+    }, {"name": 1})
 
     if not folder:
         raise HTTPException(status_code=404, detail=f"Folder '{folder_name}' not found")
@@ -114,10 +124,16 @@ async def rename_folder(
     payload: dict = Depends(verify_access_token)
 ):
     user_id = payload.get("user_id")
-    new_safe_name = "".join([c for c in request.name if c.isalnum() or c in (' ', '_', '-')]).strip()
+    new_safe_name = request.name  # sanitized by FolderUpdateRequest
 
-    # 1. Find existing folder
-    folder = await folders_collection.find_one({"_id": folder_id, "user_id": user_id})
+    # 1. Find existing folder and any folder already using the new name (one round-trip)
+    cursor = folders_collection.find({
+        "user_id": user_id,
+        "$or": [{"_id": folder_id}, {"name": new_safe_name}]
+    }, {"name": 1, "created_at": 1})
+    matches = await cursor.to_list(length=2)
+
+    folder = next((f for f in matches if f["_id"] == folder_id), None)
     if not folder:
         raise HTTPException(status_code=404, detail="Folder not found")
 
@@ -128,8 +144,7 @@ async def rename_folder(
          return {"status": "success", "data": folder}
 
     # 2. Check if new name is already taken
-    duplicate_check = await folders_collection.find_one({"user_id": user_id, "name": new_safe_name})
-    if duplicate_check:
+    if any(f["_id"] != folder_id for f in matches):
         raise HTTPException(status_code=409, detail="Folder name already in use")
 
     # 3. Rename on File System
@@ -137,21 +152,31 @@ async def rename_folder(
     new_path = get_folder_path(user_id, new_safe_name)
 
     try:
-        if os.path.exists(old_path):
-            os.rename(old_path, new_path)
-        else:
-            os.makedirs(new_path, exist_ok=True)
+        try:
+            await asyncio.to_thread(os.rename, old_path, new_path)
+        except FileNotFoundError:
+            await asyncio.to_thread(os.makedirs, new_path, exist_ok=True)
     except OSError as e:
         raise HTTPException(status_code=500, detail=f"File system error: {str(e)}")
 
-    # 4. Update MongoDB
-    await folders_collection.update_one(
-        {"_id": folder_id}, 
-        {"$set": {"name": new_safe_name}}
-    )
-
-    # Fetch updated document to return accurate timestamp/data
-    updated_folder = await folders_collection.find_one({"_id": folder_id})
+    # 4. Update MongoDB and return the updated document in the same round-trip
+    try:
+        updated_folder = await folders_collection.find_one_and_update(
+            {"_id": folder_id},
+            {"$set": {"name": new_safe_name}},
+            return_document=ReturnDocument.AFTER
+        )
+    except DuplicateKeyError:
+        # Name was taken concurrently; undo the directory rename so disk matches the DB.
+        # Best effort: the winning request may already be using new_path.
+        try:
+            await asyncio.to_thread(os.rename, new_path, old_path)
+        except OSError:
+            logger.exception(
+                "Could not roll back rename of folder %s from '%s' to '%s'; disk and DB disagree",
+                folder_id, old_path, new_path
+            )
+        raise HTTPException(status_code=409, detail="Folder name already in use")
 
     return {
         "status": "success",
@@ -168,7 +193,7 @@ async def delete_folder(
     user_id = payload.get("user_id")
 
     # 1. Find folder
-    folder = await folders_collection.find_one({"_id": folder_id, "user_id": user_id})
+    folder = await folders_collection.find_one({"_id": folder_id, "user_id": user_id}, {"name": 1})
     if not folder:
         raise HTTPException(status_code=404, detail="Folder not found")
 
@@ -176,8 +201,9 @@ async def delete_folder(
     folder_path = get_folder_path(user_id, folder["name"])
     
     try:
-        if os.path.exists(folder_path):
-            shutil.rmtree(folder_path)
+        await asyncio.to_thread(shutil.rmtree, folder_path)
+    except FileNotFoundError:
+        pass
     except OSError as e:
         raise HTTPException(status_code=500, detail=f"File system error: {str(e)}")
 
@@ -1,14 +1,27 @@
-from pydantic import BaseModel, Field
+import re
+from pydantic import AfterValidator, BaseModel, Field
 from datetime import datetime
-from typing import Optional
+from typing import Annotated, Optional
+
+# Anything other than letters, digits, spaces, underscores and hyphens
+_UNSAFE_NAME_CHARS = re.compile(r"[^\w -]+")
+
+def sanitize_folder_name(name: str) -> str:
+    safe_name = _UNSAFE_NAME_CHARS.sub("", name).strip()
+    if not safe_name:
+        raise ValueError("Invalid folder name")
+    return safe_name
+
+# Folder name as accepted from clients: length-checked, then sanitized
+FolderName = Annotated[str, Field(min_length=1, max_length=50), AfterValidator(sanitize_folder_name)]
 
 # Request Body for Creating
 class FolderCreateRequest(BaseModel):
-    name: str = Field(..., min_length=1, max_length=50)
+    name: FolderName
 
 # Request Body for Renaming
 class FolderUpdateRequest(BaseModel):
-    name: str = Field(..., min_length=1, max_length=50)
+    name: FolderName
 
 # Schema for the folder data inside the response
 class FolderData(BaseModel):
@@ -1,10 +1,52 @@
+import logging
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from app.auth.routes import router
 from app.folders.routes import router as folders_router
 from app.projects.routes import router as projects_router
+from app.database.mongo import client, users_collection, folders_collection, projects_collection
+from pymongo.errors import OperationFailure
 
-app = FastAPI()
+logger = logging.getLogger(__name__)
+
+
+async def warm_up_mongo():
+    # Connect before serving traffic so the first requests don't pay the handshake
+    await client.admin.command("ping")
+
+
+async def ensure_index(collection, keys, unique: bool = False):
+    # Routes rely on unique indexes instead of duplicate pre-checks, so refuse to
+    # start without them; a missing plain index only costs performance.
+    try:
+        await collection.create_index(keys, unique=unique)
+    except OperationFailure:
+        logger.exception(
+            "Could not create index %s on '%s'; resolve conflicting documents and restart",
+            keys, collection.name
+        )
+        if unique:
+            raise
+
+
+async def create_indexes():
+    # Folder names are unique per user (enforced by the DB, not a pre-check)
+    await ensure_index(folders_collection, [("user_id", 1), ("name", 1)], unique=True)
+    await ensure_index(folders_collection, [("user_id", 1), ("created_at", -1), ("_id", -1)])
+    await ensure_index(projects_collection, [("user_id", 1), ("name", 1)], unique=True)
+    await ensure_index(users_collection, "email", unique=True)
+    await ensure_index(users_collection, "username", unique=True)
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    await warm_up_mongo()
+    await create_indexes()
+    yield
+
+
+app = FastAPI(lifespan=lifespan)
 
 app.add_middleware(
     CORSMiddleware,
@@ -16,4 +58,4 @@ app.add_middleware(
 
 app.include_router(router)
 app.include_router(folders_router)
-app.include_router(projects_router)
\ No newline at end of file
+app.include_router(projects_router)
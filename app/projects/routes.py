@@ -1,9 +1,12 @@
+import asyncio
 import uuid
 import re
-from datetime import datetime
+from datetime import datetime, timezone
 from fastapi import APIRouter, HTTPException, Depends, status, Body
+from pymongo import ReturnDocument
+from pymongo.errors import DuplicateKeyError
 from app.core.security import verify_access_token
-from app.database.mongo import projects_collection, folders_collection
+from app.database.mongo import projects_collection, folders_collection, counters_collection
 from app.projects.schemas import (
     ProjectCreateRequest, 
     ProjectResponse, 
@@ -14,32 +17,59 @@ from app.projects.schemas import (
 router = APIRouter(prefix="/api/v1/projects", tags=["Projects"])
 
 # --- HELPER: Generate Unique Name ---
-async def generate_project_name(user_id: str) -> str:
+_NEW_PROJECT_NAME = re.compile(r"^New Project(?: (\d+))?$")
+
+# How many generated names create_project tries before giving up
+_MAX_NAME_ATTEMPTS = 10
+
+async def seed_project_counter(user_id: str, counter_id: dict):
     """
-    Generates names like "New Project", "New Project 1", "New Project 2"...
-    based on what currently exists in the DB for this user.
+    One-time seed for users created before the counter existed: start it
+    after the highest "New Project N" the user already has.
     """
-    base_name = "New Project"
-    
-    # Regex to find any project starting with "New Project"
-    # This acts as a filter to minimize data fetched
-    pattern = f"^{base_name}.*"
     cursor = projects_collection.find(
-        {"user_id": user_id, "name": {"$regex": pattern}},
+        {"user_id": user_id, "name": {"$regex": "^New Project"}},
         {"name": 1}
     )
-    existing_projects = await cursor.to_list(length=None)
-    existing_names = {p["name"] for p in existing_projects}
+    issued = 0
+    async for project in cursor:
+        match = _NEW_PROJECT_NAME.match(project["name"])
+        if match:
+            issued = max(issued, int(match.group(1) or 0) + 1)
+
+    # $max keeps this safe if another request seeded or incremented first
+    await counters_collection.update_one(
+        {"_id": counter_id},
+        {"$max": {"n": issued}},
+        upsert=True
+    )
 
-    if base_name not in existing_names:
-        return base_name
 
-    counter = 1
-    while True:
-        candidate = f"{base_name} {counter}"
-        if candidate not in existing_names:
-            return candidate
-        counter += 1
+async def generate_project_name(user_id: str) -> str:
+    """
+    Generates names like "New Project", "New Project 1", "New Project 2"...
+    from a per-user counter that is incremented atomically. A name already
+    taken (e.g. by a rename) is rejected by the unique (user_id, name) index
+    on insert, and create_project asks for the next one.
+    """
+    base_name = "New Project"
+    counter_id = {"user_id": user_id, "seq": "new_project"}
+
+    counter = await counters_collection.find_one_and_update(
+        {"_id": counter_id},
+        {"$inc": {"n": 1}},
+        return_document=ReturnDocument.AFTER
+    )
+    if counter is None:
+        await seed_project_counter(user_id, counter_id)
+        counter = await counters_collection.find_one_and_update(
+            {"_id": counter_id},
+            {"$inc": {"n": 1}},
+            return_document=ReturnDocument.AFTER
+        )
+
+    n = counter["n"] - 1
+    return base_name if n == 0 else f"{base_name} {n}"
 
 
 # --- 1. CREATE PROJECT ---
@@ -50,31 +80,41 @@ async def create_project(
 ):
     user_id = payload.get("user_id")
     
-    # 1. Generate unique default name
-    project_name = await generate_project_name(user_id)
-
-    # 2. Handle initial folder if provided
+    # 1. Generate unique default name and, if an initial folder was provided,
+    #    verify it exists and belongs to the user (both lookups run concurrently)
     folder_ids = []
     if request and request.initial_folder_id:
-        # verify folder exists and belongs to user
-        folder = await folders_collection.find_one({
-            "_id": request.initial_folder_id, 
-            "user_id": user_id
-        })
+        project_name, folder = await asyncio.gather(
+            generate_project_name(user_id),
+            folders_collection.count_documents({
+                "_id": request.initial_folder_id, 
+                "user_id": user_id
+            }, limit=1)
+        )
         if folder:
             folder_ids.append(request.initial_folder_id)
+    else:
+        project_name = await generate_project_name(user_id)
 
-    # 3. Create Project Document
+    # 2. Create Project Document
     new_project = {
         "_id": str(uuid.uuid4()),
         "user_id": user_id,
         "name": project_name,
         "folder_ids": folder_ids, # List of grouped folders
         "is_initialized": False,
-        "created_at": datetime.utcnow()
+        "created_at": datetime.now(timezone.utc)
     }
 
-    await projects_collection.insert_one(new_project)
+    # The name may already be taken (e.g. by a rename); pick the next one and retry
+    for _ in range(_MAX_NAME_ATTEMPTS):
+        try:
+            await projects_collection.insert_one(new_project)
+            break
+        except DuplicateKeyError:
+            new_project["name"] = await generate_project_name(user_id)
+    else:
+        raise HTTPException(status_code=409, detail="Could not generate a unique project name")
 
     return new_project
 
@@ -91,14 +131,7 @@ async def update_project(
     # Construct update fields
     update_data = {}
     if request.name is not None:
-        # Check for duplicate name if renaming
-        exists = await projects_collection.find_one({
-            "user_id": user_id, 
-            "name": request.name, 
-            "_id": {"$ne": project_id}
-        })
-        if exists:
-            raise HTTPException(status_code=409, detail="Project name already in use")
+        # Duplicate names are rejected by the unique (user_id, name) index below
         update_data["name"] = request.name
         
     if request.is_initialized is not None:
@@ -108,11 +141,14 @@ async def update_project(
         raise HTTPException(status_code=400, detail="No valid fields to update")
 
     # Perform Update
-    result = await projects_collection.find_one_and_update(
-        {"_id": project_id, "user_id": user_id},
-        {"$set": update_data},
-        return_document=True
-    )
+    try:
+        result = await projects_collection.find_one_and_update(
+            {"_id": project_id, "user_id": user_id},
+            {"$set": update_data},
+            return_document=True
+        )
+    except DuplicateKeyError:
+        raise HTTPException(status_code=409, detail="Project name already in use")
 
     if not result:
         raise HTTPException(status_code=404, detail="Project not found")
@@ -129,13 +165,15 @@ async def add_folder_to_project(
 ):
     user_id = payload.get("user_id")
 
-    # 1. Verify Project Exists
-    project = await projects_collection.find_one({"_id": project_id, "user_id": user_id})
+    # 1. Verify Project and Folder exist (independent lookups, run concurrently)
+    project, folder = await asyncio.gather(
+        projects_collection.count_documents({"_id": project_id, "user_id": user_id}, limit=1),
+        folders_collection.count_documents({"_id": request.folder_id, "user_id": user_id}, limit=1)
+    )
     if not project:
         raise HTTPException(status_code=404, detail="Project not found")
 
-    # 2. Verify Folder Exists (and belongs to user)
-    folder = await folders_collection.find_one({"_id": request.folder_id, "user_id": user_id})
+    # 2. Folder must belong to user
     if not folder:
         raise HTTPException(status_code=404, detail="Folder not found or access denied")
 
@@ -157,13 +195,10 @@ async def delete_project(
 ):
     user_id = payload.get("user_id")
 
-    # Check existence
-    project = await projects_collection.find_one({"_id": project_id, "user_id": user_id})
-    if not project:
-        raise HTTPException(status_code=404, detail="Project not found")
-
     # Delete (Note: This deletes the grouping, but NOT the actual folders themselves, 
     # which is standard behavior for "grouping" containers)
-    await projects_collection.delete_one({"_id": project_id})
+    result = await projects_collection.delete_one({"_id": project_id, "user_id": user_id})
+    if result.deleted_count == 0:
+        raise HTTPException(status_code=404, detail="Project not found")
 
     return None
\ No newline at end of file